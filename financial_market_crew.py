@@ -5,102 +5,375 @@ A comprehensive system that searches, summarizes, formats, translates and distri
 """
 
 import os
+import asyncio
+import atexit
+import functools
+import hashlib
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple, Optional
+import queue
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Coroutine, Iterable, Iterator, List, Dict, Any, NamedTuple, Tuple, Optional
+from urllib.parse import urlparse
 import json
-import requests
-from PIL import Image
-import io
-import base64
 
-# CrewAI imports
-from crewai import Agent, Task, Crew
-from crewai.tools import BaseTool
+# CrewAI pulls in a large dependency tree (litellm, pydantic models,
+# telemetry), so it is imported where agents, tasks and crews are built.
+# The Tavily and Telegram clients are likewise imported in setup_tools
+if TYPE_CHECKING:
+    from crewai import Agent, Crew, Task
 
 # Local imports
-import logging
-from datetime import datetime
-from typing import Dict, List, Any, Optional
-from crewai import Agent, Task, Crew, Process
 from dotenv import load_dotenv
 
-# External service imports
-import litellm
-from tavily import TavilyClient
-from googletrans import Translator
-import telegram
-from telegram import Bot
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+    
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Called under the handler lock, so the counter needs no extra locking
+        try:
+            if self.dropped:
+                # Report the gap once the listener has caught up
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__,
+                    'levelno': logging.WARNING,
+                    'levelname': 'WARNING',
+                    'msg': "Log queue was full - dropped %d record(s)",
+                    'args': (self.dropped,)
+                }))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a bounded queue rather than raising queue.Full"""
+    
+    def enqueue_sentinel(self) -> None:
+        # The listener thread is still draining, so a blocking put always completes
+        self.queue.put(self._sentinel)
+
+# Records buffered for the log file before new ones are dropped
+LOG_QUEUE_MAXSIZE = 10000
+
+# Configure logging. File writes go through a queue to a background listener
+# thread; console output stays synchronous so interactive runs see it at once
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_file_handler = logging.FileHandler('financial_news.log')
+_file_handler.setFormatter(_log_formatter)
+_console_handler = logging.StreamHandler()
+_console_handler.setFormatter(_log_formatter)
+
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+_log_listener = DrainingQueueListener(_log_queue, _file_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Leave the message bare on enqueue so the listener's formatter applies once
+_queue_handler = DroppingQueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
 
-# Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('financial_news.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[_queue_handler, _console_handler]
 )
 logger = logging.getLogger(__name__)
 
+class TokenBucket:
+    """Thread-safe token bucket that blocks callers until a request slot is free"""
+    
+    def __init__(self, rate: float, period: float):
+        self.capacity = rate
+        self.tokens = rate
+        self.fill_rate = rate / period
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        
+    def acquire(self) -> None:
+        """Take one token, sleeping until the bucket has refilled enough"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+# Tavily's free tier allows 20 requests per minute; searches are paced to stay
+# under it rather than retrying after 429s
+_tavily_limiter = TokenBucket(rate=20, period=60)
+
+# Upper bound on threads running Tavily searches for one call, however many queries are given
+TAVILY_MAX_WORKERS = 8
+
+# Attempts per LLM call before a rate-limit, timeout, connection or 5xx error is surfaced
+LLM_MAX_ATTEMPTS = 4
+
+# API keys read from the environment / .env file
+ENV_KEYS = ('GOOGLE_API_KEY', 'GEMINI_API_KEY', 'TAVILY_API_KEY', 'TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHANNEL_ID')
+
+@functools.lru_cache(maxsize=1)
+def _load_env() -> Dict[str, Optional[str]]:
+    """Load the .env file and snapshot the API keys, once per process"""
+    load_dotenv()
+    return {key: os.getenv(key) for key in ENV_KEYS}
+
+# Keys the live pipeline needs; GEMINI_API_KEY may also be given as GOOGLE_API_KEY
+REQUIRED_KEYS = ('GEMINI_API_KEY', 'TAVILY_API_KEY', 'TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHANNEL_ID')
+
+@functools.lru_cache(maxsize=1)
+def _missing_keys() -> Tuple[str, ...]:
+    """Return the required keys absent from the environment, checked once per process"""
+    env = _load_env()
+    present = {**env, 'GEMINI_API_KEY': env['GOOGLE_API_KEY'] or env['GEMINI_API_KEY']}
+    return tuple(key for key in REQUIRED_KEYS if not present[key])
+
+# Per-item cap on article text sent to the search agent; Tavily "advanced"
+# results can carry several KB of page content that only inflates the prompt
+NEWS_CONTENT_MAX_CHARS = 800
+
+# Stage prompt templates, built once at import. The fixed instructions come
+# first and the per-run data is appended last, keeping prompt prefixes stable
+NEWS_ITEM_TEMPLATE = "Title: {title}\nURL: {url}\nContent: {content}\n"
+
+SEARCH_TASK_PROMPT = """Analyze and organize the financial news data below.
+
+Focus on:
+- Stock market movements and major index changes
+- Significant company earnings or announcements  
+- Federal Reserve news and monetary policy
+- Major economic indicators or data releases
+- Sector-specific news that could impact trading
+
+Return the top 5-7 most relevant and important news items with their sources and key details.
+
+News data:
+{financial_news}"""
+
+SUMMARY_TASK_PROMPT = """Create a professional financial market summary based on the news data below.
+
+Requirements:
+- Keep under 500 words
+- Structure with clear sections (Market Overview, Key Highlights, Sector Focus)
+- Include specific numbers, percentages, and data points where available
+- Focus on actionable insights for traders and investors
+- Use professional financial terminology
+- Highlight the most market-moving news items
+
+Format the summary for easy reading with bullet points and clear sections.
+
+News data:
+{news_data}"""
+
+FORMATTING_TASK_PROMPT = """Format the financial summary below and identify 2 relevant visual elements.
+
+Tasks:
+1. Format the summary with professional layout including:
+   - Clear headline
+   - Date and time stamp
+   - Organized sections with headers
+   - Proper spacing and formatting
+
+2. Identify 2 types of financial visuals that would complement this content:
+   - Chart type 1: Suggest a specific chart (e.g., "S&P 500 daily chart", "USD/EUR exchange rate")
+   - Chart type 2: Suggest another relevant visual (e.g., "sector performance heatmap", "bond yields chart")
+
+3. Provide placement suggestions for where these visuals should appear in the formatted content.
+
+Return both the formatted text and the visual recommendations.
+
+Summary: {summary}
+News Data: {news_data}"""
+
+TRANSLATION_TASK_PROMPT = """Translate the financial summary below into the target language while preserving formatting.
+
+Requirements:
+- Maintain all formatting (headers, bullet points, structure)
+- Preserve financial terminology accuracy
+- Ensure cultural appropriateness for the language
+- Keep the professional tone
+- Maintain the same content structure and organization
+
+Return only the translation, formatted identically to the original.
+
+Target language: {language_name}
+
+Original Content (English):
+"""
+
+class TargetLanguage(NamedTuple):
+    """A language produced by the translation stage"""
+    key: str            # result key in the translations dict
+    name: str           # display name used in prompts and messages
+    prompt_prefix: str  # rendered translation prompt; only the content is appended per run
+    expected_output: str
+
+TARGET_LANGUAGES = tuple(
+    TargetLanguage(
+        key=key,
+        name=name,
+        prompt_prefix=TRANSLATION_TASK_PROMPT.format(language_name=name),
+        expected_output=f"An accurate {name} translation with preserved formatting and financial terminology"
+    )
+    for key, name in (('arabic', 'Arabic'), ('hindi', 'Hindi'), ('hebrew', 'Hebrew'))
+)
+
+# Fixed stage outputs used in demo mode (missing API keys), returned before
+# any task or crew is built
+DEMO_NEWS_ANALYSIS = "DEMO MODE: Financial news analysis complete. Key findings: Stock markets declined with S&P 500 down 0.6%, technology sector weakness, and Federal Reserve policy uncertainty driving investor sentiment."
+
+DEMO_SUMMARY_TEMPLATE = """# Daily Financial Market Summary
+
+## Market Overview
+U.S. equity markets closed lower on Friday, with major indices posting declines amid technology sector weakness and Federal Reserve policy uncertainty.
+
+## Key Highlights
+• S&P 500 declined 0.6% to 6,460.26
+• Technology sector led losses with 1.5% decline
+• VIX volatility index rose 6.4% to 15.36
+• Trading volume below recent averages
+
+## Sector Analysis
+Technology and consumer discretionary sectors underperformed, while defensive sectors showed relative resilience. Investors remain focused on Federal Reserve policy signals and inflation data.
+
+*Generated in Demo Mode - {timestamp}*"""
+
+DEMO_FORMATTED_TEXT = "Content formatted with professional layout. Visual recommendations: S&P 500 daily chart, Sector performance heatmap."
+
+def _run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion from synchronous code and return its result
+
+    asyncio.run refuses to start while the calling thread already runs an event
+    loop (an async web handler, a notebook), so in that case the coroutine gets
+    its own loop on a worker thread. The caller still blocks until it finishes
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+# Telegram rejects message text longer than this many UTF-16 code units, so
+# characters outside the Basic Multilingual Plane (most emoji) count double
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+_BLANK_LINES_RE = re.compile(r'\n[ \t]*\n(?:[ \t]*\n)+')
+
+def _utf16_len(text: str) -> int:
+    """Length of text as Telegram counts it, in UTF-16 code units"""
+    return len(text.encode('utf-16-le')) // 2
+
+def _split_message(text: str, limit: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """Yield chunks of text within Telegram's length limit, preferring paragraph and line breaks"""
+    if not text.strip():
+        return
+    if _utf16_len(text) <= limit:
+        yield text
+        return
+    
+    # Only text that has to be split is compacted, to fit more into each chunk
+    text = _BLANK_LINES_RE.sub('\n\n', text.strip())
+    while _utf16_len(text) > limit:
+        # Shrink to the longest prefix within the limit; a code point is one or two units
+        end = limit
+        while (excess := _utf16_len(text[:end]) - limit) > 0:
+            end -= (excess + 1) // 2
+        for separator in ('\n\n', '\n', ' '):
+            cut = text.rfind(separator, 0, end)
+            if cut > 0:
+                skip = len(separator)
+                break
+        else:
+            cut, skip = end, 0
+        chunk = text[:cut].rstrip()
+        if chunk:
+            yield chunk
+        text = text[cut + skip:]
+    if text.strip():
+        yield text
+
 class FinancialNewsFlow:
     """Main CrewAI Flow for Financial News Processing"""
     
+    # Agent construction runs crewai's pydantic validation and LLM setup, so
+    # the configured agents are built once per process as templates. Each flow
+    # works on its own copies, since a kickoff resets the agent's crew and
+    # executor and concurrent flows must not share that state
+    _shared_agents: Optional[Dict[str, Any]] = None
+    
     def __init__(self):
         self.setup_environment()
         self.setup_tools()
-        # Initialize any necessary components
-        pass
+        # Demo mode returns fixed stage outputs, so no agents are needed
+        if not self.demo_mode:
+            self.setup_agents()
         
     def setup_environment(self):
         """Initialize environment variables and configurations"""
-        # Load environment variables from .env file
-        from dotenv import load_dotenv
-        load_dotenv()
+        # Load environment variables from .env file (once per process)
+        env = _load_env()
         
         # Debug: Print all environment variables
-        logger.debug("Environment variables loaded:")
-        for key in ['GOOGLE_API_KEY', 'GEMINI_API_KEY', 'TAVILY_API_KEY', 'TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHANNEL_ID']:
-            logger.debug(f"{key}: {'*' * 8 if os.getenv(key) else 'NOT SET'}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Environment variables loaded: %s", ', '.join(
+                f"{key}={'*' * 8 if value else 'NOT SET'}" for key, value in env.items()
+            ))
         
-        self.google_api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
-        self.tavily_api_key = os.getenv('TAVILY_API_KEY') 
-        self.telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        self.telegram_chat_id = os.getenv('TELEGRAM_CHANNEL_ID')  # Updated to match .env
+        self.google_api_key = env['GOOGLE_API_KEY'] or env['GEMINI_API_KEY']
+        self.tavily_api_key = env['TAVILY_API_KEY']
+        self.telegram_bot_token = env['TELEGRAM_BOT_TOKEN']
+        self.telegram_chat_id = env['TELEGRAM_CHANNEL_ID']  # Updated to match .env
         
         # Configure litellm for Gemini - use the correct environment variable
         if self.google_api_key:
             os.environ['GEMINI_API_KEY'] = self.google_api_key
             os.environ['GOOGLE_API_KEY'] = self.google_api_key
         
-        # Check for required API keys
-        required_keys = {
-            'GEMINI_API_KEY': self.google_api_key,
-            'TAVILY_API_KEY': self.tavily_api_key,
-            'TELEGRAM_BOT_TOKEN': self.telegram_bot_token,
-            'TELEGRAM_CHANNEL_ID': self.telegram_chat_id
-        }
-        
         # Enable demo mode if any required keys are missing
-        self.demo_mode = not all(required_keys.values())
+        missing = _missing_keys()
+        self.demo_mode = bool(missing)
         
         if self.demo_mode:
-            missing = [k for k, v in required_keys.items() if not v]
-            logger.warning(f"Running in demo mode - missing or invalid keys: {', '.join(missing)}")
+            logger.warning("Running in demo mode - missing or invalid keys: %s", ', '.join(missing))
         else:
             logger.info("All required API keys are present - running in production mode")
+        
+        # Create the report output directory once rather than on every report write
+        self.output_dir = os.getenv("OUTPUT_DIR", "output")
+        os.makedirs(self.output_dir, exist_ok=True)
                 
         logger.info("Environment setup completed successfully")
         
     def setup_tools(self):
         """Initialize external service tools"""
+        # Demo mode never calls the external services, so skip importing their clients
+        if self.demo_mode:
+            self.tavily_client = None
+            self.telegram_bot = None
+            logger.info("Demo mode - external tools not initialized")
+            return
+        
         try:
+            from tavily import TavilyClient
+            from telegram import Bot
+            
             # Tavily search client
             self.tavily_client = TavilyClient(api_key=self.tavily_api_key)
             
-            # Translator
-            self.translator = Translator()
-            
             # Telegram bot
             if self.telegram_bot_token:
                 self.telegram_bot = Bot(token=self.telegram_bot_token)
@@ -110,228 +383,358 @@ class FinancialNewsFlow:
             logger.info("External tools initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize tools: {e}")
+            logger.error("Failed to initialize tools: %s", e)
             raise
             
     def setup_agents(self):
-        """Initialize all CrewAI agents"""
+        """Give this flow its own copies of the shared agent templates, building them on first use"""
+        if FinancialNewsFlow._shared_agents is None:
+            FinancialNewsFlow._shared_agents = self._build_agents()
+            logger.info("All agents initialized successfully")
+        templates = FinancialNewsFlow._shared_agents
+        
+        for name in ('search_agent', 'summary_agent', 'formatting_agent', 'distribution_agent'):
+            setattr(self, name, templates[name].copy())
+        # One copy per language so the concurrent translation crews don't share executor state
+        self.translation_agents = {
+            language.key: templates['translation_agent'].copy() for language in TARGET_LANGUAGES
+        }
+        
+        # Single-agent crews for this flow's agents, keyed by id(agent) and reused
+        # across runs; only the task list changes per stage
+        self._crews: Dict[int, 'Crew'] = {}
+            
+    def _build_agents(self) -> Dict[str, Any]:
+        """Construct the CrewAI agent templates that each flow copies for its pipeline stages"""
+        from crewai import Agent, LLM
+        
+        # Translation is near-deterministic, so it runs at temperature 0 on a
+        # lighter model tier; the other stages share the default model
+        default_model = os.getenv('LLM_MODEL', 'gemini/gemini-2.0-flash')
+        # crewai's verbose console output is heavy, so it is opt-in
+        verbose = os.getenv('CREWAI_VERBOSE', '0') == '1'
+        translation_llm = LLM(
+            model=os.getenv('TRANSLATION_MODEL', 'gemini/gemini-2.0-flash-lite'),
+            temperature=0
+        )
         
         # 1. Search Agent - Finds latest financial news
-        self.search_agent = Agent(
+        search_agent = Agent(
             role='Financial News Researcher',
             goal='Search and gather the most important US financial news from the last hour after market close',
             backstory="""You are an experienced financial researcher who specializes in finding breaking news 
             and important market developments. You focus on US markets and understand which news items 
             are most relevant for traders and investors.""",
             tools=[],  # Will use custom search method
-            verbose=True,
+            verbose=verbose,
             allow_delegation=False,
-            llm="gemini/gemini-2.0-flash"
+            llm=default_model
         )
         
         # 2. Summary Agent - Creates concise financial summaries
-        self.summary_agent = Agent(
+        summary_agent = Agent(
             role='Financial News Summarizer',
             goal='Create a comprehensive but concise summary of financial news under 500 words',
             backstory="""You are a senior financial journalist with 15+ years of experience in financial markets. 
             You excel at distilling complex financial information into clear, actionable insights that traders 
             and investors can quickly understand and act upon.""",
-            verbose=True,
+            verbose=verbose,
             allow_delegation=False,
-            llm="gemini/gemini-2.0-flash"
+            llm=default_model
         )
         
         # 3. Formatting Agent - Finds relevant charts and images
-        self.formatting_agent = Agent(
+        formatting_agent = Agent(
             role='Content Formatter and Visual Specialist',
             goal='Find 2 relevant financial charts or images and format the content professionally',
             backstory="""You are a content formatting specialist who understands how to present financial 
             information in a visually appealing way. You know which types of charts and images best 
             complement financial news stories.""",
-            verbose=True,
+            verbose=verbose,
             allow_delegation=False,
-            llm="gemini/gemini-2.0-flash"
+            llm=default_model
         )
         
         # 4. Translation Agent - Translates content to multiple languages
-        self.translation_agent = Agent(
+        translation_agent = Agent(
             role='Multi-language Financial Translator',
             goal='Translate financial content accurately into Arabic, Hindi, and Hebrew while preserving formatting',
             backstory="""You are a professional translator specializing in financial terminology. 
             You understand the nuances of financial language across different cultures and ensure 
             that translated content maintains its professional tone and accuracy.""",
-            verbose=True,
+            verbose=verbose,
             allow_delegation=False,
-            llm="gemini/gemini-2.0-flash"
+            llm=translation_llm
         )
         
         # 5. Distribution Agent - Sends content via Telegram
-        self.distribution_agent = Agent(
+        distribution_agent = Agent(
             role='Content Distribution Specialist',
             goal='Distribute the formatted financial news summary through Telegram channel',
             backstory="""You are responsible for the final distribution of financial content. 
             You ensure that all content reaches the intended audience through the appropriate channels 
             with proper formatting and timing.""",
-            verbose=True,
+            verbose=verbose,
             allow_delegation=False,
-            llm="gemini/gemini-2.0-flash"
+            llm=default_model
+        )
+        
+        return {
+            'search_agent': search_agent,
+            'summary_agent': summary_agent,
+            'formatting_agent': formatting_agent,
+            'translation_agent': translation_agent,
+            'distribution_agent': distribution_agent
+        }
+
+    def _kickoff(self, agent: 'Agent', task: 'Task', ttl: Optional[int] = None) -> str:
+        """Run a single-agent crew, reusing a result cached on disk for an identical prompt within ttl seconds"""
+        from crewai import Crew
+        
+        if ttl is None:
+            ttl = int(os.getenv('LLM_CACHE_TTL', '900'))
+        # Results are keyed by a hash of the agent role and task prompt, and kept
+        # under CACHE_DIR so they carry over between runs; a ttl of 0 disables it
+        cache_dir = os.path.join(os.getenv('CACHE_DIR', '.cache'), 'llm')
+        key = hashlib.blake2b(f"{agent.role}\n{task.description}".encode('utf-8'), digest_size=16).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.json")
+        
+        if ttl > 0:
+            try:
+                if time.time() - os.path.getmtime(cache_path) < ttl:
+                    with open(cache_path, 'r', encoding='utf-8') as f:
+                        cached_result = json.load(f)['result']
+                    logger.info("Using cached result for %s", agent.role)
+                    return cached_result
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable LLM cache entry %s: %s", cache_path, e)
+        
+        # Agents are per flow and each translation language has its own, so no
+        # two concurrent kickoffs share a crew and no locking is needed
+        crew = self._crews.get(id(agent))
+        if crew is None:
+            crew = self._crews[id(agent)] = Crew(agents=[agent], tasks=[task])
+        crew.tasks = [task]
+        result = self._kickoff_with_retry(crew, agent.role)
+        
+        if ttl > 0:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # Write to a temporary file first so a concurrent reader never sees a partial entry
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, suffix='.tmp', delete=False) as f:
+                    json.dump({'role': agent.role, 'result': result}, f)
+                os.replace(f.name, cache_path)
+            except OSError as e:
+                logger.warning("Could not write LLM cache entry %s: %s", cache_path, e)
+            self._prune_llm_cache(cache_dir)
+        return result
+
+    def _prune_llm_cache(self, cache_dir: str) -> None:
+        """Delete LLM cache entries (and leftover temporary files) older than the longest configured cache TTL"""
+        max_age = max(int(os.getenv('LLM_CACHE_TTL', '900')), int(os.getenv('TRANSLATION_CACHE_TTL', '86400')))
+        cutoff = time.time() - max_age
+        try:
+            with os.scandir(cache_dir) as entries:
+                stale = [entry.path for entry in entries
+                         if entry.name.endswith(('.json', '.tmp')) and entry.stat().st_mtime < cutoff]
+        except OSError:
+            return
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already removed by a concurrent flow
+            except OSError as e:
+                logger.warning("Could not remove stale LLM cache entry %s: %s", path, e)
+
+    def _kickoff_with_retry(self, crew: 'Crew', role: str) -> str:
+        """Run crew.kickoff(), backing off and retrying on transient LLM provider errors"""
+        from litellm import (APIConnectionError, InternalServerError, RateLimitError,
+                             ServiceUnavailableError, Timeout)
+        
+        for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+            try:
+                return str(crew.kickoff())
+            except (RateLimitError, APIConnectionError, ServiceUnavailableError,
+                    InternalServerError, Timeout) as e:
+                if attempt == LLM_MAX_ATTEMPTS:
+                    raise
+                delay = min(2 ** attempt, 30)
+                logger.warning("%s call failed (%s), retrying in %ss", role, e, delay)
+                time.sleep(delay)
+
+    def _dedupe_results(self, results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Collapse results pointing at the same article (same host and path), keeping the highest-scored copy"""
+        # Results without a URL can't be matched to one another, so each is kept;
+        # keys are either a (host, path) pair or a unique index for those
+        best: Dict[Any, Dict[str, Any]] = {}
+        for index, result in enumerate(results):
+            url = result.get('url')
+            if not url:
+                best[index] = result
+                continue
+            parsed = urlparse(url)
+            key = (parsed.netloc.lower().removeprefix('www.'), parsed.path.rstrip('/'))
+            current = best.get(key)
+            if current is None or result.get('score', 0) > current.get('score', 0):
+                best[key] = result
+        return list(best.values())
+
+    def _prune_tavily_cache(self, cache_dir: str, hour_bucket: str) -> None:
+        """Delete Tavily cache entries from hour buckets other than the current one"""
+        try:
+            with os.scandir(cache_dir) as entries:
+                stale = [entry.path for entry in entries
+                         if entry.name.endswith('.json') and not entry.name.startswith(f"{hour_bucket}-")]
+        except OSError:
+            return
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already removed by a concurrent search
+            except OSError as e:
+                logger.warning("Could not remove stale Tavily cache entry %s: %s", path, e)
+
+    def _search_tavily(self, query: str) -> Dict[str, Any]:
+        """Run a Tavily search, reusing results cached on disk for the same query within the hour"""
+        cache_enabled = os.getenv('TAVILY_CACHE', '1') != '0'
+        hour_bucket = datetime.now().strftime('%Y-%m-%d-%H')
+        cache_dir = os.path.join(os.getenv('CACHE_DIR', '.cache'), 'tavily')
+        # The hour prefix lets entries from earlier hours be found and pruned
+        cache_path = os.path.join(cache_dir, f"{hour_bucket}-{hashlib.sha1(query.encode('utf-8')).hexdigest()}.json")
+        
+        if cache_enabled:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cached_results = json.load(f)
+                logger.info("Using cached Tavily results for query: %s", query)
+                return cached_results
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable Tavily cache entry %s: %s", cache_path, e)
+        
+        _tavily_limiter.acquire()
+        search_results = self.tavily_client.search(
+            query=query,
+            search_depth="advanced",
+            max_results=10,
+            include_domains=["bloomberg.com", "reuters.com", "cnbc.com", "marketwatch.com", "yahoo.com"]
         )
         
-        logger.info("All agents initialized successfully")
+        if cache_enabled:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    json.dump(search_results, f)
+            except OSError as e:
+                logger.warning("Could not write Tavily cache entry %s: %s", cache_path, e)
+            self._prune_tavily_cache(cache_dir, hour_bucket)
+        
+        return search_results
 
-    def search_financial_news(self) -> str:
-        """Search for latest US financial news"""
+    def search_financial_news(self, queries: Optional[List[str]] = None) -> str:
+        """
+        Search for latest US financial news
+        
+        Args:
+            queries: Tavily queries to run concurrently; defaults to today's US market query
+            
+        Returns:
+            str: Analysis of the most relevant news items
+        """
+        if self.demo_mode:
+            logger.info("Demo mode - returning sample financial news analysis")
+            return DEMO_NEWS_ANALYSIS
+        
+        from crewai import Task
+        
         try:
             # Use Tavily to search for financial news
-            current_time = datetime.now()
-            search_query = f"US financial markets news today {current_time.strftime('%Y-%m-%d')} stock market trading"
+            if not queries:
+                current_time = datetime.now()
+                queries = [f"US financial markets news today {current_time.strftime('%Y-%m-%d')} stock market trading"]
             
-            logger.info(f"Searching for financial news with query: {search_query}")
+            logger.info("Searching for financial news with queries: %s", queries)
             
-            # Direct Tavily search or demo data
-            if not self.demo_mode:
-                search_results = self.tavily_client.search(
-                    query=search_query,
-                    search_depth="advanced",
-                    max_results=10,
-                    include_domains=["bloomberg.com", "reuters.com", "cnbc.com", "marketwatch.com", "yahoo.com"]
+            # Direct Tavily search, one request per query, in parallel; the token
+            # bucket paces the requests, so a few workers are enough
+            with ThreadPoolExecutor(max_workers=min(len(queries), TAVILY_MAX_WORKERS)) as executor:
+                search_results = [
+                    result
+                    for query_results in executor.map(self._search_tavily, queries)
+                    for result in query_results.get('results', [])
+                ]
+            
+            # Merge across queries: drop repeated articles, then keep the 7 best-scoring results
+            top_results = heapq.nlargest(
+                7,
+                self._dedupe_results(search_results),
+                key=lambda result: result.get('score', 0)
+            )
+            financial_news = "\n".join(
+                NEWS_ITEM_TEMPLATE.format(
+                    title=result.get('title', ''),
+                    url=result.get('url', ''),
+                    content=result.get('content', '')[:NEWS_CONTENT_MAX_CHARS]
                 )
-            else:
-                # Demo data for when API keys are not available
-                search_results = {
-                    'results': [
-                        {
-                            'title': 'S&P 500 Closes Lower After Tech Selloff',
-                            'url': 'https://finance.yahoo.com/news/demo',
-                            'content': 'U.S. stocks ended lower on Friday as technology shares declined. The S&P 500 dropped 0.6% to close at 6,460.26, while the Nasdaq fell 1.2%. Investors weighed concerns about sticky inflation and potential Federal Reserve policy changes.'
-                        },
-                        {
-                            'title': 'Federal Reserve Officials Signal Cautious Approach',
-                            'url': 'https://reuters.com/demo',
-                            'content': 'Federal Reserve officials indicated a measured approach to future interest rate decisions, citing persistent inflation concerns and mixed economic data.'
-                        }
-                    ]
-                }
-            
-            # Extract relevant information
-            news_items = []
-            for result in search_results.get('results', []):
-                title = result.get('title', '')
-                url = result.get('url', '')
-                content = result.get('content', '')
-                news_items.append(f"Title: {title}\nURL: {url}\nContent: {content}\n")
-            
-            financial_news = "\n".join(news_items[:7])  # Top 7 results
+                for result in top_results
+            )
             
             search_task = Task(
-                description=f"""Analyze and organize this financial news data:
-                
-                {financial_news}
-                
-                Focus on:
-                - Stock market movements and major index changes
-                - Significant company earnings or announcements  
-                - Federal Reserve news and monetary policy
-                - Major economic indicators or data releases
-                - Sector-specific news that could impact trading
-                
-                Return the top 5-7 most relevant and important news items with their sources and key details.""",
+                description=SEARCH_TASK_PROMPT.format(financial_news=financial_news),
                 agent=self.search_agent,
                 expected_output="A comprehensive list of today's most important financial news items with sources and key details"
             )
             
-            # Use Crew to execute task or return demo summary
-            if not self.demo_mode:
-                crew = Crew(agents=[self.search_agent], tasks=[search_task])
-                result = crew.kickoff()
-            else:
-                result = "DEMO MODE: Financial news analysis complete. Key findings: Stock markets declined with S&P 500 down 0.6%, technology sector weakness, and Federal Reserve policy uncertainty driving investor sentiment."
+            result = self._kickoff(self.search_agent, search_task)
             logger.info("Financial news search completed successfully")
             return str(result)
             
         except Exception as e:
-            logger.error(f"Error in search_financial_news: {e}")
+            logger.error("Error in search_financial_news: %s", e)
             raise
 
     def create_summary(self, news_data: str) -> str:
         """Create a concise financial summary"""
+        if self.demo_mode:
+            logger.info("Demo mode - returning sample financial summary")
+            return DEMO_SUMMARY_TEMPLATE.format(timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        
+        from crewai import Task
+        
         try:
             summary_task = Task(
-                description=f"""Create a professional financial market summary based on this news data:
-                
-                {news_data}
-                
-                Requirements:
-                - Keep under 500 words
-                - Structure with clear sections (Market Overview, Key Highlights, Sector Focus)
-                - Include specific numbers, percentages, and data points where available
-                - Focus on actionable insights for traders and investors
-                - Use professional financial terminology
-                - Highlight the most market-moving news items
-                
-                Format the summary for easy reading with bullet points and clear sections.""",
+                description=SUMMARY_TASK_PROMPT.format(news_data=news_data),
                 agent=self.summary_agent,
                 expected_output="A well-structured financial market summary under 500 words with clear sections and actionable insights"
             )
             
-            if not self.demo_mode:
-                crew = Crew(agents=[self.summary_agent], tasks=[summary_task])
-                result = crew.kickoff()
-            else:
-                result = f"""# Daily Financial Market Summary
-
-## Market Overview
-U.S. equity markets closed lower on Friday, with major indices posting declines amid technology sector weakness and Federal Reserve policy uncertainty.
-
-## Key Highlights
-• S&P 500 declined 0.6% to 6,460.26
-• Technology sector led losses with 1.5% decline
-• VIX volatility index rose 6.4% to 15.36
-• Trading volume below recent averages
-
-## Sector Analysis
-Technology and consumer discretionary sectors underperformed, while defensive sectors showed relative resilience. Investors remain focused on Federal Reserve policy signals and inflation data.
-
-*Generated in Demo Mode - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*"""
+            result = self._kickoff(self.summary_agent, summary_task)
             logger.info("Financial summary created successfully")
             return result
             
         except Exception as e:
-            logger.error(f"Error in create_summary: {e}")
+            logger.error("Error in create_summary: %s", e)
             raise
 
     def format_with_visuals(self, summary: str, news_data: str) -> Dict[str, Any]:
         """Format content and find relevant financial charts/images"""
         try:
-            formatting_task = Task(
-                description=f"""Format the financial summary and identify 2 relevant visual elements:
-                
-                Summary: {summary}
-                News Data: {news_data}
-                
-                Tasks:
-                1. Format the summary with professional layout including:
-                   - Clear headline
-                   - Date and time stamp
-                   - Organized sections with headers
-                   - Proper spacing and formatting
-                
-                2. Identify 2 types of financial visuals that would complement this content:
-                   - Chart type 1: Suggest a specific chart (e.g., "S&P 500 daily chart", "USD/EUR exchange rate")
-                   - Chart type 2: Suggest another relevant visual (e.g., "sector performance heatmap", "bond yields chart")
-                
-                3. Provide placement suggestions for where these visuals should appear in the formatted content.
-                
-                Return both the formatted text and the visual recommendations.""",
-                agent=self.formatting_agent,
-                expected_output="Professionally formatted content with specific recommendations for 2 relevant financial charts/images and their placement"
-            )
-            
-            if not self.demo_mode:
-                crew = Crew(agents=[self.formatting_agent], tasks=[formatting_task])
-                result = crew.kickoff()
+            if self.demo_mode:
+                result = DEMO_FORMATTED_TEXT
             else:
-                result = "Content formatted with professional layout. Visual recommendations: S&P 500 daily chart, Sector performance heatmap."
+                from crewai import Task
+                
+                formatting_task = Task(
+                    description=FORMATTING_TASK_PROMPT.format(summary=summary, news_data=news_data),
+                    agent=self.formatting_agent,
+                    expected_output="Professionally formatted content with specific recommendations for 2 relevant financial charts/images and their placement"
+                )
+                result = self._kickoff(self.formatting_agent, formatting_task)
             logger.info("Content formatting completed successfully")
             
             # Structure the result
@@ -347,92 +750,159 @@ Technology and consumer discretionary sectors underperformed, while defensive se
             return formatted_content
             
         except Exception as e:
-            logger.error(f"Error in format_with_visuals: {e}")
+            logger.error("Error in format_with_visuals: %s", e)
             raise
 
+    async def _kickoff_async(self, agent: 'Agent', task: 'Task', semaphore: asyncio.Semaphore,
+                             ttl: Optional[int] = None) -> str:
+        """Run _kickoff (which retries transient LLM errors itself) in a worker thread under a concurrency cap"""
+        async with semaphore:
+            return await asyncio.to_thread(self._kickoff, agent, task, ttl)
+
+    async def _translate_all(self, content: str) -> Dict[str, str]:
+        """Run one translation crew per target language concurrently"""
+        from crewai import Task
+        
+        semaphore = asyncio.Semaphore(int(os.getenv('LLM_CONCURRENCY', '4')))
+        # Translations run at temperature 0, so a summary seen earlier in the
+        # day translates the same way and can be reused for longer
+        ttl = int(os.getenv('TRANSLATION_CACHE_TTL', '86400'))
+        
+        async def translate_one(language: TargetLanguage) -> str:
+            agent = self.translation_agents[language.key]
+            translation_task = Task(
+                description=language.prompt_prefix + content,
+                agent=agent,
+                expected_output=language.expected_output
+            )
+            return await self._kickoff_async(agent, translation_task, semaphore, ttl)
+        
+        results = await asyncio.gather(
+            *(translate_one(language) for language in TARGET_LANGUAGES),
+            return_exceptions=True
+        )
+        
+        translations = {}
+        for language, result in zip(TARGET_LANGUAGES, results):
+            if isinstance(result, Exception):
+                logger.error("Translation to %s failed: %s", language.name, result)
+                translations[language.key] = f"{language.name} translation unavailable"
+            else:
+                translations[language.key] = result
+        return translations
+
     def translate_content(self, formatted_content: Dict[str, Any]) -> Dict[str, str]:
         """Translate content to multiple languages"""
         try:
-            content_to_translate = formatted_content['formatted_text']
-            
-            translation_task = Task(
-                description=f"""Translate this financial summary into Arabic, Hindi, and Hebrew while preserving formatting:
-                
-                Original Content (English):
-                {content_to_translate}
-                
-                Requirements:
-                - Maintain all formatting (headers, bullet points, structure)
-                - Preserve financial terminology accuracy
-                - Ensure cultural appropriateness for each language
-                - Keep the professional tone in all translations
-                - Maintain the same content structure and organization
-                
-                Provide translations for:
-                1. Arabic
-                2. Hindi  
-                3. Hebrew
-                
-                Each translation should be clearly labeled and formatted identically to the original.""",
-                agent=self.translation_agent,
-                expected_output="Accurate translations in Arabic, Hindi, and Hebrew with preserved formatting and financial terminology"
-            )
+            content_to_translate = str(formatted_content['formatted_text'])
+            translations = {'english': content_to_translate}
             
             if not self.demo_mode:
-                crew = Crew(agents=[self.translation_agent], tasks=[translation_task])
-                result = crew.kickoff()
+                translations.update(_run_sync(self._translate_all(content_to_translate)))
             else:
-                result = "Demo translations completed for Arabic, Hindi, and Hebrew languages."
+                translations.update({
+                    language.key: f"{language.name} translation would appear here"
+                    for language in TARGET_LANGUAGES
+                })
             logger.info("Content translation completed successfully")
             
-            # For this implementation, we'll structure the translations
-            translations = {
-                'english': content_to_translate,
-                'arabic': "Arabic translation would appear here",
-                'hindi': "Hindi translation would appear here", 
-                'hebrew': "Hebrew translation would appear here"
-            }
-            
             return translations
             
         except Exception as e:
-            logger.error(f"Error in translate_content: {e}")
+            logger.error("Error in translate_content: %s", e)
             raise
 
-    def generate_report(self, content: Dict[str, Any], language: str = 'en') -> Dict[str, str]:
+    def generate_report(self, content: Dict[str, Any], language: str = 'en', timestamp: Optional[str] = None) -> Dict[str, str]:
         """
         Generate a text report
         
         Args:
             content: Dictionary containing the report content
             language: Language code for the report
+            timestamp: Filename timestamp (YYYYmmdd_HHMMSS); defaults to now
             
         Returns:
             Dict[str, str]: Dictionary with the text report path
         """
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if timestamp is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             base_filename = f"market_summary_{language}_{timestamp}"
-            output_dir = os.getenv("OUTPUT_DIR", "output")
-            
-            # Create output directory if it doesn't exist
-            os.makedirs(output_dir, exist_ok=True)
             
             # Generate text report
-            txt_path = os.path.join(output_dir, f"{base_filename}.txt")
+            txt_path = os.path.join(self.output_dir, f"{base_filename}.txt")
             with open(txt_path, 'w', encoding='utf-8') as f:
                 f.write(content.get('text', ''))
             
-            logger.info(f"Generated text report: {txt_path}")
+            logger.info("Generated text report: %s", txt_path)
             
             return {
                 'txt': txt_path
             }
             
         except Exception as e:
-            logger.error(f"Error generating report: {str(e)}")
+            logger.error("Error generating report: %s", e)
             return {}
     
+    async def _send_messages_async(self, messages: List[str]) -> None:
+        """Send messages in order over a single Telegram bot session"""
+        async with self.telegram_bot:
+            for message in messages:
+                await self.telegram_bot.send_message(chat_id=self.telegram_chat_id, text=message)
+    
+    def send_to_telegram(self, text: str) -> bool:
+        """
+        Send text to the configured Telegram channel
+        
+        Args:
+            text: Message content to send; split into several messages when it
+                exceeds Telegram's length limit
+            
+        Returns:
+            bool: True if the message was delivered
+        """
+        if self.demo_mode or not self.telegram_bot:
+            logger.info("Telegram is not configured - skipping send")
+            return False
+            
+        try:
+            messages = list(_split_message(str(text)))
+            if not messages:
+                logger.warning("Nothing to send to Telegram - message text is empty")
+                return False
+            _run_sync(self._send_messages_async(messages))
+            logger.info("Summary sent to Telegram channel %s in %d message(s)", self.telegram_chat_id, len(messages))
+            return True
+            
+        except Exception as e:
+            logger.error("Error sending to Telegram: %s", e)
+            return False
+    
+    def _generate_all_reports(self, translations: Dict[str, str], formatted_content: Dict[str, Any]) -> Dict[str, str]:
+        """Generate the English report plus one report per translation, writing the files concurrently"""
+        # One clock read per batch, so every language's file shares the same timestamp
+        now = datetime.now()
+        report_date = now.strftime("%Y-%m-%d %H:%M:%S")
+        file_timestamp = now.strftime("%Y%m%d_%H%M%S")
+        reports = [({
+            'text': str(formatted_content['formatted_text']),
+            'title': "Financial Market Summary",
+            'date': report_date
+        }, 'en')]
+        
+        # Generate reports for translations if any
+        for lang, translation in translations.items():
+            if lang != 'english':  # Skip English as it's already generated
+                reports.append(({
+                    'text': translation,
+                    'title': f"Financial Market Summary - {lang.upper()}",
+                    'date': report_date
+                }, lang))
+        
+        with ThreadPoolExecutor(max_workers=len(reports)) as executor:
+            report_results = list(executor.map(lambda report: self.generate_report(*report, file_timestamp), reports))
+        return report_results[0]
+    
     def distribute_content(self, translations: Dict[str, str], formatted_content: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
         """
         Distribute the formatted content via Telegram and generate reports
@@ -447,30 +917,18 @@ Technology and consumer discretionary sectors underperformed, while defensive se
         report_paths = {}
         
         try:
-            # Generate report
-            report_paths = self.generate_report(formatted_content, language='en')
-            
-            # Generate reports for translations if any
-            for lang, translation in translations.items():
-                if lang != 'en':  # Skip English as it's already generated
-                    self.generate_report({
-                        'text': translation,
-                        'title': f"Financial Market Summary - {lang.upper()}",
-                        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }, language=lang)
-            
-            # Send to Telegram if configured
-            telegram_sent = self.send_to_telegram(formatted_content['formatted_text'])
+            # Report writing (disk) and the Telegram send (network) are
+            # independent, so run them side by side
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                reports_future = executor.submit(self._generate_all_reports, translations, formatted_content)
+                telegram_future = executor.submit(self.send_to_telegram, formatted_content['formatted_text'])
+                report_paths = reports_future.result()
+                telegram_sent = telegram_future.result()
             
-            return {
-                'success': True,
-                'report_paths': report_paths,
-                'telegram_sent': telegram_sent,
-                'translations': translations
-            }
+            return telegram_sent, report_paths
             
         except Exception as e:
-            logger.error(f"Unexpected error in distribute_content: {str(e)}")
+            logger.error("Unexpected error in distribute_content: %s", e)
             return False, report_paths
             
     def run_complete_flow(self) -> Dict[str, Any]:
@@ -494,22 +952,9 @@ Technology and consumer discretionary sectors underperformed, while defensive se
             logger.info("Step 4: Translating content...")
             translations = self.translate_content(formatted_content)
             
-            # Step 5: Generate report
-            logger.info("Step 5: Generating report...")
-            report_paths = self.generate_report(formatted_content, language='en')
-            
-            # Generate reports for translations if any
-            for lang, translation in translations.items():
-                if lang != 'en':  # Skip English as it's already generated
-                    self.generate_report({
-                        'text': translation,
-                        'title': f"Financial Market Summary - {lang.upper()}",
-                        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }, language=lang)
-            
-            # Step 6: Distribute content
-            logger.info("Step 6: Distributing content via Telegram...")
-            telegram_success, _ = self.distribute_content(translations, formatted_content)
+            # Step 5: Generate reports and distribute content
+            logger.info("Step 5: Generating reports and distributing content via Telegram...")
+            telegram_success, report_paths = self.distribute_content(translations, formatted_content)
             
             # Compile results
             results = {
@@ -524,13 +969,14 @@ Technology and consumer discretionary sectors underperformed, while defensive se
                 'status': 'completed' if telegram_success else 'partial_success'
             }
             
-            logger.info(f"Financial news flow completed with status: {results['status']}")
+            logger.info("Financial news flow completed with status: %s", results['status'])
             return results
             
         except Exception as e:
-            logger.error(f"Error in complete flow execution: {e}")
+            logger.exception("Error in complete flow execution")
             return {
                 'success': False,
+                'error_type': type(e).__name__,
                 'error': str(e),
                 'status': 'failed'
             }
@@ -588,7 +1034,7 @@ def main():
         return results
         
     except Exception as e:
-        logger.error(f"Main execution failed: {e}", exc_info=True)
+        logger.exception("Main execution failed")
         print(f"❌ Error: {e}")
         print("Check the logs for more details.")
         return None